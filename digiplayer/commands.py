@@ -1,22 +1,82 @@
 """Command execution for DigiPlayer client."""
 
+import fcntl
+import glob
+import io
 import logging
+import mmap
 import os
+import shutil
+import struct
 import subprocess
-from typing import Optional
+import threading
+from typing import BinaryIO, Callable, ClassVar, Optional, Union
 
 import requests
 
 from .config import Config
+from .transport import REQUEST_TIMEOUT, create_session
 
 logger = logging.getLogger(__name__)
 
+# Backlight power nodes (official DSI displays): 0 = on, 4 = powerdown
+BACKLIGHT_POWER_GLOB = "/sys/class/backlight/*/bl_power"
+
+# Screen power tools in order of preference: (on, off) argv
+SCREEN_POWER_COMMANDS = {
+    "vcgencmd": (["vcgencmd", "display_power", "1"], ["vcgencmd", "display_power", "0"]),
+    "tvservice": (["tvservice", "-p"], ["tvservice", "-o"]),
+}
+
+# Screenshot tools in order of preference
+SCREENSHOT_TOOLS = ("raspi2png", "scrot")
+
+# Linux framebuffer
+FRAMEBUFFER_DEVICE = "/dev/fb0"
+FBIOGET_VSCREENINFO = 0x4600
+FBIOGET_FSCREENINFO = 0x4602
+FB_VAR_SCREENINFO_SIZE = 160
+FB_FIX_SCREENINFO_SIZE = 80
+# id, smem_start, smem_len, type, type_aux, visual, xpanstep, ypanstep,
+# ywrapstep, line_length (native alignment)
+FB_FIX_SCREENINFO_FORMAT = "16sL4I3HI"
+
+# Sockets of a running Wayland compositor or X server. While one is up
+# (e.g. the cage kiosk on KMS), /dev/fb0 only holds the emulated console.
+DISPLAY_SERVER_SOCKET_GLOBS = ("/run/user/*/wayland-*", "/tmp/.X11-unix/X*")
+
 
 class CommandExecutor:
-    """Executes commands received from the server."""
+    """Executes commands received from the server.
+
+    Acknowledgements are queued and sent with the next heartbeat.
+    """
 
-    def __init__(self, config: Config):
+    # Command type -> handler(self, command_data)
+    _HANDLERS: ClassVar[dict[str, Callable[["CommandExecutor", dict], bool]]] = {
+        "reboot": lambda self, _: self._reboot(),
+        "refresh": lambda self, _: self._refresh(),
+        "screen_on": lambda self, _: self._screen_on(),
+        "screen_off": lambda self, _: self._screen_off(),
+        "screenshot": lambda self, _: self._screenshot(),
+        "update_playlist": lambda self, data: self._update_playlist(data),
+    }
+    _KNOWN: ClassVar[frozenset[str]] = frozenset(_HANDLERS)
+
+    def __init__(self, config: Config, http: Optional[requests.Session] = None):
         self.config = config
+        self.http = http or create_session()
+        self.pending_acks: list[dict] = []
+        self._acks_lock = threading.Lock()
+
+        # Detect display control backends once instead of probing per command
+        self._backlight_nodes = glob.glob(BACKLIGHT_POWER_GLOB)
+        self._screen_backend = next(
+            (tool for tool in SCREEN_POWER_COMMANDS if shutil.which(tool)), None
+        )
+        self._screenshot_tool = next(
+            (tool for tool in SCREENSHOT_TOOLS if shutil.which(tool)), None
+        )
 
     def execute(self, command: dict) -> bool:
         """Execute a command and acknowledge it."""
@@ -24,56 +84,104 @@ class CommandExecutor:
         cmd_type = command.get("command_type")
         cmd_data = command.get("command_data", {})
 
-        logger.info(f"Executing command: {cmd_type} (id={cmd_id})")
+        # Reject types this client doesn't know (e.g. during server rollouts)
+        if cmd_type not in self._KNOWN:
+            logger.warning("Unknown command type: %s", cmd_type)
+            if cmd_id:
+                self._acknowledge(cmd_id, False, f"Unknown command type: {cmd_type}")
+            return False
+
+        logger.info("Executing command: %s (id=%s)", cmd_type, cmd_id)
 
         success = False
         error_message = None
 
         try:
-            if cmd_type == "reboot":
-                success = self._reboot()
-            elif cmd_type == "refresh":
-                success = self._refresh()
-            elif cmd_type == "screen_on":
-                success = self._screen_on()
-            elif cmd_type == "screen_off":
-                success = self._screen_off()
-            elif cmd_type == "screenshot":
-                success = self._screenshot()
-            elif cmd_type == "update_playlist":
-                success = self._update_playlist(cmd_data)
-            else:
-                error_message = f"Unknown command type: {cmd_type}"
-                logger.warning(error_message)
+            success = self._HANDLERS[cmd_type](self, cmd_data)
 
         except Exception as e:
             error_message = str(e)
-            logger.error(f"Command execution failed: {e}")
+            logger.error("Command execution failed: %s", e)
 
         # Acknowledge the command
         if cmd_id:
             self._acknowledge(cmd_id, success, error_message)
 
+        # sudo reboot returns once systemd has accepted it, but the service is
+        # stopped before the next heartbeat could carry the ack, and the server
+        # would then send the reboot again after boot
+        if cmd_type == "reboot":
+            self.flush_acks()
+
         return success
 
     def _acknowledge(self, command_id: int, success: bool, error_message: Optional[str] = None) -> None:
-        """Acknowledge command execution to the server."""
+        """Queue a command acknowledgement for the next heartbeat."""
         if not self.config.player_id:
             return
 
+        with self._acks_lock:
+            self.pending_acks.append({
+                "id": command_id,
+                "success": success,
+                "error_message": error_message,
+            })
+
+    def take_acks(self) -> list[dict]:
+        """Remove and return all queued acknowledgements."""
+        with self._acks_lock:
+            acks, self.pending_acks = self.pending_acks, []
+        return acks
+
+    def requeue_acks(self, acks: list[dict]) -> None:
+        """Put undelivered acknowledgements back at the front of the queue."""
+        with self._acks_lock:
+            self.pending_acks[:0] = acks
+
+    def flush_acks(self) -> None:
+        """Send all queued acknowledgements now instead of with the next heartbeat."""
+        self.send_acks(self.take_acks())
+
+    def send_acks(self, acks: list[dict]) -> None:
+        """Acknowledge commands one request at a time.
+
+        Used when the server rejected the heartbeat carrying the
+        acknowledgements and when they can't wait for the next heartbeat.
+        Acknowledgements that couldn't be delivered are queued again.
+        """
+        for i, ack in enumerate(acks):
+            if not self._send_ack(ack["id"], ack["success"], ack["error_message"]):
+                # Don't wait out a timeout per ack while the server is failing
+                self.requeue_acks(acks[i:])
+                return
+
+    def _send_ack(self, command_id: int, success: bool, error_message: Optional[str] = None) -> bool:
+        """Acknowledge command execution to the server.
+
+        Returns:
+            False if the acknowledgement should be sent again later
+        """
+        if not self.config.player_id:
+            return False
+
         url = f"{self.config.api_url}/players/{self.config.player_id}/commands/{command_id}/acknowledge"
-        params = {"success": str(success).lower()}
-        if error_message:
-            params["error_message"] = error_message
 
         try:
-            response = requests.post(url, params=params, timeout=10)
+            response = self.http.post(
+                url,
+                json={"success": success, "error_message": error_message},
+                timeout=REQUEST_TIMEOUT
+            )
             if response.status_code == 200:
-                logger.debug(f"Command {command_id} acknowledged")
-            else:
-                logger.warning(f"Failed to acknowledge command: {response.status_code}")
+                logger.debug("Command %s acknowledged", command_id)
+                return True
+
+            logger.warning("Failed to acknowledge command: %s", response.status_code)
+            # A 4xx won't change on a retry
+            return response.status_code < 500
         except Exception as e:
-            logger.error(f"Failed to acknowledge command: {e}")
+            logger.error("Failed to acknowledge command: %s", e)
+            return False
 
     def _reboot(self) -> bool:
         """Reboot the device."""
@@ -82,7 +190,7 @@ class CommandExecutor:
             subprocess.run(["sudo", "reboot"], check=True)
             return True
         except subprocess.CalledProcessError as e:
-            logger.error(f"Reboot failed: {e}")
+            logger.error("Reboot failed: %s", e)
             return False
 
     def _refresh(self) -> bool:
@@ -91,86 +199,156 @@ class CommandExecutor:
         # TODO: Implement media sync
         return True
 
+    def _set_display_power(self, on: bool) -> bool:
+        """Switch the display using the backend detected at startup.
+
+        sysfs backlight nodes are written directly; otherwise the detected
+        screen power tool is run.
+        """
+        for node in self._backlight_nodes:
+            try:
+                with open(node, "w") as f:
+                    f.write("0" if on else "4")
+                return True
+            except OSError as e:
+                logger.debug("Could not write %s: %s", node, e)
+
+        state = "on" if on else "off"
+        if not self._screen_backend:
+            logger.error("Screen %s failed: no screen control available", state)
+            return False
+
+        on_cmd, off_cmd = SCREEN_POWER_COMMANDS[self._screen_backend]
+        try:
+            subprocess.run(on_cmd if on else off_cmd, check=True, capture_output=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error("Screen %s failed: %s", state, e)
+            return False
+
     def _screen_on(self) -> bool:
         """Turn screen on."""
         logger.info("Turning screen on...")
-        try:
-            # Try vcgencmd (Raspberry Pi)
-            subprocess.run(
-                ["vcgencmd", "display_power", "1"],
-                check=True,
-                capture_output=True
-            )
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            try:
-                # Try tvservice
-                subprocess.run(
-                    ["tvservice", "-p"],
-                    check=True,
-                    capture_output=True
-                )
-                return True
-            except Exception as e:
-                logger.error(f"Screen on failed: {e}")
-                return False
+        return self._set_display_power(True)
 
     def _screen_off(self) -> bool:
         """Turn screen off."""
         logger.info("Turning screen off...")
-        try:
-            # Try vcgencmd (Raspberry Pi)
-            subprocess.run(
-                ["vcgencmd", "display_power", "0"],
-                check=True,
-                capture_output=True
-            )
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            try:
-                # Try tvservice
-                subprocess.run(
-                    ["tvservice", "-o"],
-                    check=True,
-                    capture_output=True
-                )
-                return True
-            except Exception as e:
-                logger.error(f"Screen off failed: {e}")
-                return False
+        return self._set_display_power(False)
 
     def _screenshot(self) -> bool:
-        """Capture and upload a screenshot."""
+        """Capture a screenshot and upload it to the server.
+
+        The PNG is kept in memory and streamed straight to the upload
+        endpoint, so nothing is written to the SD card.
+        """
         logger.info("Capturing screenshot...")
-        screenshot_path = "/tmp/screenshot.png"
 
         try:
-            # Capture screenshot using raspi2png or scrot
-            try:
-                subprocess.run(
-                    ["raspi2png", "-p", screenshot_path],
+            # Read the framebuffer directly, else use raspi2png or scrot
+            buffer = io.BytesIO()
+            if self._capture_framebuffer(buffer):
+                image = buffer.getvalue()
+            elif self._screenshot_tool == "raspi2png":
+                image = subprocess.run(
+                    ["raspi2png", "-s"],
                     check=True,
                     capture_output=True
-                )
-            except FileNotFoundError:
-                subprocess.run(
-                    ["scrot", screenshot_path],
+                ).stdout
+            elif self._screenshot_tool == "scrot":
+                image = subprocess.run(
+                    ["scrot", "-"],
                     check=True,
                     capture_output=True,
                     env={**os.environ, "DISPLAY": ":0"}
-                )
+                ).stdout
+            else:
+                logger.error("Screenshot failed: no capture tool available")
+                return False
 
-            # Upload screenshot
-            # TODO: Implement screenshot upload endpoint
-            logger.info(f"Screenshot saved to {screenshot_path}")
-            return True
+            if not image:
+                logger.error("Screenshot failed: capture was empty")
+                return False
+
+            return self._upload_screenshot(image)
 
         except Exception as e:
-            logger.error(f"Screenshot failed: {e}")
+            logger.error("Screenshot failed: %s", e)
             return False
 
+    def _upload_screenshot(self, image: bytes) -> bool:
+        """Upload PNG screenshot bytes to the server."""
+        if not self.config.player_id:
+            logger.error("Screenshot upload failed: not registered")
+            return False
+
+        url = f"{self.config.api_url}/players/{self.config.player_id}/screenshot"
+        response = self.http.put(
+            url,
+            data=image,
+            headers={"Content-Type": "image/png"},
+            timeout=30
+        )
+        if response.status_code in (200, 201, 204):
+            logger.info("Screenshot uploaded (%d bytes)", len(image))
+            return True
+
+        logger.error("Screenshot upload failed: %s", response.status_code)
+        return False
+
+    def _capture_framebuffer(self, output: Union[str, BinaryIO]) -> bool:
+        """Save the framebuffer contents as PNG without spawning a process.
+
+        Returns:
+            False if Pillow, the framebuffer or its pixel format is unavailable,
+            or a display server owns the screen
+        """
+        if any(glob.glob(pattern) for pattern in DISPLAY_SERVER_SOCKET_GLOBS):
+            return False
+
+        try:
+            from PIL import Image
+        except ImportError:
+            return False
+
+        try:
+            fd = os.open(FRAMEBUFFER_DEVICE, os.O_RDONLY)
+        except OSError:
+            return False
+
+        try:
+            info = fcntl.ioctl(fd, FBIOGET_VSCREENINFO, bytes(FB_VAR_SCREENINFO_SIZE))
+            # xres, yres, xres_virtual, yres_virtual, xoffset, yoffset,
+            # bits_per_pixel, grayscale, red.offset
+            xres, yres, _, _, _, yoffset, bpp, _, red_offset = struct.unpack_from("9I", info)
+            fix_info = fcntl.ioctl(fd, FBIOGET_FSCREENINFO, bytes(FB_FIX_SCREENINFO_SIZE))
+            line_length = struct.unpack_from(FB_FIX_SCREENINFO_FORMAT, fix_info)[-1]
+
+            if bpp == 32:
+                rawmode = "BGRX" if red_offset == 16 else "RGBX"
+            elif bpp == 16:
+                rawmode = "BGR;16"
+            else:
+                logger.debug("Unsupported framebuffer depth: %s", bpp)
+                return False
+
+            # Skip to the visible page when the framebuffer is panned
+            with mmap.mmap(fd, line_length * (yoffset + yres), prot=mmap.PROT_READ) as fb:
+                with memoryview(fb)[line_length * yoffset:] as visible:
+                    image = Image.frombuffer("RGB", (xres, yres), visible, "raw", rawmode, line_length, 1)
+                    image.save(output, "PNG")
+                    del image
+            return True
+
+        except (OSError, ValueError) as e:
+            logger.debug("Framebuffer capture failed: %s", e)
+            return False
+
+        finally:
+            os.close(fd)
+
     def _update_playlist(self, data: dict) -> bool:
         """Update the current playlist."""
-        logger.info(f"Updating playlist: {data}")
+        logger.info("Updating playlist: %s", data)
         # TODO: Implement playlist update
         return True
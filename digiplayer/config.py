@@ -1,13 +1,13 @@
 """Configuration management for DigiPlayer client."""
 
-import json
+import functools
 import logging
 import os
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 from typing import Optional
 
-from .utils import generate_device_id
+from .utils import generate_device_id, json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +23,19 @@ DEV_CONFIG_FILE = DEV_CONFIG_DIR / "config.json"
 DEV_MEDIA_DIR = DEV_CONFIG_DIR / "media"
 DEV_LOG_DIR = DEV_CONFIG_DIR / "logs"
 
+# Fields the derived URLs are built from
+_URL_FIELDS = frozenset(("server_url", "api_prefix", "player_id"))
 
-@dataclass
+# Effective user can't change while running
+_IS_ROOT = os.geteuid() == 0
+
+# Last loaded/saved config and the mtime of the file it came from
+_cached_config: Optional["Config"] = None
+_cached_mtime: float = 0.0
+_dirs_created = False
+
+
+@dataclass(slots=True)
 class Config:
     """DigiPlayer configuration."""
 
@@ -46,85 +57,132 @@ class Config:
     media_dir: str = ""
     log_dir: str = ""
 
+    # Derived URLs, rebuilt whenever a field in _URL_FIELDS is assigned
+    _api_url: str = field(default="", init=False, repr=False, compare=False)
+    _heartbeat_url: str = field(default="", init=False, repr=False, compare=False)
+
     def __post_init__(self):
         """Generate device ID if not set."""
         if not self.device_id:
             self.device_id = generate_device_id()
+        self._update_urls()
+
+    def __setattr__(self, name: str, value) -> None:
+        # super() doesn't work in slotted dataclasses
+        object.__setattr__(self, name, value)
+        if name in _URL_FIELDS and hasattr(self, "_heartbeat_url"):
+            self._update_urls()
+
+    def _update_urls(self) -> None:
+        """Rebuild the derived URLs."""
+        api_url = f"{self.server_url}{self.api_prefix}"
+        object.__setattr__(self, "_api_url", api_url)
+        object.__setattr__(
+            self,
+            "_heartbeat_url",
+            f"{api_url}/players/{self.player_id}/heartbeat" if self.player_id else ""
+        )
 
     @property
     def api_url(self) -> str:
         """Full API URL."""
-        return f"{self.server_url}{self.api_prefix}"
+        return self._api_url
 
     @property
     def heartbeat_url(self) -> str:
         """Heartbeat endpoint URL."""
-        if self.player_id:
-            return f"{self.api_url}/players/{self.player_id}/heartbeat"
-        return ""
+        return self._heartbeat_url
 
     def to_dict(self) -> dict:
         """Convert config to dictionary."""
-        return asdict(self)
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.init}
 
     @classmethod
     def from_dict(cls, data: dict) -> "Config":
         """Create config from dictionary."""
-        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+        names = {f.name for f in fields(cls) if f.init}
+        return cls(**{k: v for k, v in data.items() if k in names})
 
 
+@functools.lru_cache(maxsize=1)
 def get_config_paths() -> tuple[Path, Path, Path]:
     """Get appropriate config paths based on environment."""
     # Use system paths if running as root, otherwise dev paths
-    if os.geteuid() == 0:
+    if _IS_ROOT:
         return CONFIG_DIR, MEDIA_DIR, LOG_DIR
     else:
         return DEV_CONFIG_DIR, DEV_MEDIA_DIR, DEV_LOG_DIR
 
 
+def _ensure_dirs() -> None:
+    """Create config, media and log directories once per process."""
+    global _dirs_created
+    if _dirs_created:
+        return
+
+    for path in get_config_paths():
+        path.mkdir(parents=True, exist_ok=True)
+    _dirs_created = True
+
+
 def load_config() -> Config:
-    """Load configuration from file or create default."""
+    """Load configuration from file or create default.
+
+    The parsed config is cached and only re-read when the file changes.
+    """
+    global _cached_config, _cached_mtime
     config_dir, media_dir, log_dir = get_config_paths()
     config_file = config_dir / "config.json"
 
     # Ensure directories exist
-    config_dir.mkdir(parents=True, exist_ok=True)
-    media_dir.mkdir(parents=True, exist_ok=True)
-    log_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_dirs()
+
+    try:
+        mtime = config_file.stat().st_mtime
+    except FileNotFoundError:
+        mtime = None
+
+    if mtime is not None and _cached_config is not None and mtime == _cached_mtime:
+        return _cached_config
 
     config = Config(
         media_dir=str(media_dir),
         log_dir=str(log_dir)
     )
 
-    if config_file.exists():
+    if mtime is not None:
         try:
-            with open(config_file, "r") as f:
-                data = json.load(f)
-                config = Config.from_dict(data)
-                config.media_dir = str(media_dir)
-                config.log_dir = str(log_dir)
-                logger.info(f"Loaded config from {config_file}")
+            data = json_loads(config_file.read_bytes())
+            config = Config.from_dict(data)
+            config.media_dir = str(media_dir)
+            config.log_dir = str(log_dir)
+            _cached_config, _cached_mtime = config, mtime
+            logger.info("Loaded config from %s", config_file)
         except Exception as e:
-            logger.error(f"Failed to load config: {e}")
+            logger.error("Failed to load config: %s", e)
     else:
         # Save default config
         save_config(config)
-        logger.info(f"Created default config at {config_file}")
+        logger.info("Created default config at %s", config_file)
 
     return config
 
 
 def save_config(config: Config) -> None:
     """Save configuration to file."""
+    global _cached_config, _cached_mtime
     config_dir, _, _ = get_config_paths()
     config_file = config_dir / "config.json"
 
-    config_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_dirs()
 
     try:
-        with open(config_file, "w") as f:
-            json.dump(config.to_dict(), f, indent=2)
-        logger.info(f"Saved config to {config_file}")
+        # Write a temp file and rename it over the config so a power cut
+        # mid-write can't leave a truncated config.json behind
+        tmp_file = config_file.with_suffix(".json.tmp")
+        tmp_file.write_bytes(json_dumps(config.to_dict(), indent=True))
+        os.replace(tmp_file, config_file)
+        _cached_config, _cached_mtime = config, config_file.stat().st_mtime
+        logger.info("Saved config to %s", config_file)
     except Exception as e:
-        logger.error(f"Failed to save config: {e}")
+        logger.error("Failed to save config: %s", e)
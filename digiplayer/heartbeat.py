@@ -1,13 +1,21 @@
 """Heartbeat service for DigiPlayer client."""
 
 import logging
-import time
-from typing import Callable, Optional
+from typing import Optional
 
 import requests
 
+from .commands import CommandExecutor
 from .config import Config, save_config
-from .utils import get_ip_address, get_mac_address, get_screen_resolution, get_storage_info
+from .transport import REQUEST_TIMEOUT, create_session
+from .utils import (
+    get_ip_address,
+    get_mac_address,
+    get_screen_resolution,
+    get_storage_info,
+    json_dumps,
+    json_loads,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,13 +23,28 @@ logger = logging.getLogger(__name__)
 class HeartbeatService:
     """Service for sending heartbeats to the server."""
 
-    def __init__(self, config: Config, command_handler: Optional[Callable] = None):
+    def __init__(
+        self,
+        config: Config,
+        command_executor: Optional[CommandExecutor] = None,
+        http: Optional[requests.Session] = None
+    ):
         self.config = config
-        self.command_handler = command_handler
-        self.running = False
+        self.command_executor = command_executor
+        self.http = http or create_session()
         self.last_error: Optional[str] = None
         self.consecutive_failures = 0
         self.registered = False
+        # Reused for every heartbeat; only the changing fields are updated
+        self._payload = {
+            "unique_id": config.device_id,
+            "status": "online",
+            "storage_used": 0,
+            "storage_total": 0,
+            "ip_address": "",
+            "mac_address": get_mac_address(),
+            "screen_resolution": get_screen_resolution(),
+        }
 
     def send_heartbeat(self) -> dict:
         """Send a single heartbeat to the server."""
@@ -29,38 +52,35 @@ class HeartbeatService:
             logger.warning("Player ID not set - cannot send heartbeat")
             return {"status": "error", "message": "Not registered"}
 
-        storage_used, storage_total = get_storage_info()
+        payload = self._update_payload()
 
-        payload = {
-            "unique_id": self.config.device_id,
-            "status": "online",
-            "storage_used": storage_used,
-            "storage_total": storage_total,
-            "ip_address": get_ip_address(),
-            "mac_address": get_mac_address(),
-            "screen_resolution": get_screen_resolution(),
-        }
+        # Acknowledgements of previously executed commands ride along
+        acks = self.command_executor.take_acks() if self.command_executor else []
+        if acks:
+            payload = {**payload, "command_acks": acks}
+        acks_handled = not acks
 
         try:
-            response = requests.post(
+            response = self.http.post(
                 self.config.heartbeat_url,
-                json=payload,
-                timeout=10,
+                data=json_dumps(payload),
+                timeout=REQUEST_TIMEOUT,
                 headers={"Content-Type": "application/json"}
             )
 
             if response.status_code == 200:
-                data = response.json()
+                acks_handled = True
+                data = json_loads(response.content)
                 self.consecutive_failures = 0
                 self.last_error = None
 
                 # Process any pending commands
                 commands = data.get("commands", [])
-                if commands and self.command_handler:
+                if commands and self.command_executor:
                     for cmd in commands:
-                        self.command_handler(cmd)
+                        self.command_executor.execute(cmd)
 
-                logger.debug(f"Heartbeat OK - {len(commands)} commands")
+                logger.debug("Heartbeat OK - %d commands", len(commands))
                 return data
 
             elif response.status_code == 404:
@@ -69,10 +89,20 @@ class HeartbeatService:
                 return {"status": "error", "message": "Player not found"}
 
             else:
+                # 503 responses were already retried by the transport
+                self.consecutive_failures += 1
                 self.last_error = f"HTTP {response.status_code}"
-                logger.error(f"Heartbeat failed: {response.status_code} - {response.text}")
+                logger.error("Heartbeat failed: %s - %s", response.status_code, response.text)
+
+                # The server is up but rejected the heartbeat; try the
+                # acknowledgement endpoint instead
+                if acks:
+                    self.command_executor.send_acks(acks)
+                    acks_handled = True
                 return {"status": "error", "message": self.last_error}
 
+        # Connection errors only surface once retries are exhausted; read
+        # timeouts are not retried
         except requests.exceptions.Timeout:
             self.consecutive_failures += 1
             self.last_error = "Timeout"
@@ -82,15 +112,37 @@ class HeartbeatService:
         except requests.exceptions.ConnectionError as e:
             self.consecutive_failures += 1
             self.last_error = "Connection error"
-            logger.warning(f"Connection error: {e}")
+            logger.warning("Connection error: %s", e)
             return {"status": "error", "message": "Connection error"}
 
         except Exception as e:
             self.consecutive_failures += 1
             self.last_error = str(e)
-            logger.error(f"Heartbeat error: {e}")
+            logger.error("Heartbeat error: %s", e)
             return {"status": "error", "message": str(e)}
 
+        finally:
+            # Don't drop acknowledgements along with a failed heartbeat; the
+            # next one carries them
+            if not acks_handled:
+                self.command_executor.requeue_acks(acks)
+
+    def _update_payload(self) -> dict:
+        """Refresh the changing fields of the heartbeat payload.
+
+        The utils helpers cache their results, so this is mostly lookups.
+        Screen resolution is only looked up again until it is known.
+        """
+        payload = self._payload
+        payload["storage_used"], payload["storage_total"] = get_storage_info()
+        payload["ip_address"] = get_ip_address()
+
+        # The display may not be up yet on early heartbeats, so keep asking
+        if payload["screen_resolution"] == "unknown":
+            payload["screen_resolution"] = get_screen_resolution()
+
+        return payload
+
     def check_registration(self) -> bool:
         """Check if player is registered on the server."""
         if not self.config.player_id:
@@ -110,32 +162,10 @@ class HeartbeatService:
         For now, player_id must be set manually after registration.
         """
         # TODO: Implement lookup endpoint on backend
-        logger.info(f"Device ID: {self.config.device_id}")
+        logger.info("Device ID: %s", self.config.device_id)
         logger.info("Register this device in the web UI and set player_id in config")
         return None
 
-    def run(self, interval: Optional[int] = None) -> None:
-        """Run the heartbeat loop."""
-        if interval is None:
-            interval = self.config.heartbeat_interval
-
-        self.running = True
-        logger.info(f"Starting heartbeat service (interval: {interval}s)")
-        logger.info(f"Device ID: {self.config.device_id}")
-        logger.info(f"Server: {self.config.server_url}")
-
-        if self.config.player_id:
-            logger.info(f"Player ID: {self.config.player_id}")
-        else:
-            logger.warning("Player ID not set - heartbeat disabled until registered")
-
-        while self.running:
-            if self.config.player_id:
-                self.send_heartbeat()
-
-            time.sleep(interval)
-
     def stop(self) -> None:
-        """Stop the heartbeat loop."""
-        self.running = False
+        """Stop the heartbeat service."""
         logger.info("Heartbeat service stopped")
@@ -8,6 +8,7 @@ until the device is registered, then plays assigned content.
 
 import argparse
 import logging
+import sched
 import signal
 import sys
 import threading
@@ -16,9 +17,6 @@ from typing import Optional, Any
 
 from . import __version__
 from .config import load_config, save_config, Config
-from .commands import CommandExecutor
-from .heartbeat import HeartbeatService
-from .registration import RegistrationService
 from .utils import setup_logging, is_raspberry_pi
 
 logger = logging.getLogger(__name__)
@@ -28,25 +26,38 @@ class DigiPlayer:
     """Main DigiPlayer application."""
 
     def __init__(self, config: Config):
+        # Imported here so config-only CLI commands don't load requests
+        from .commands import CommandExecutor
+        from .heartbeat import HeartbeatService
+        from .registration import RegistrationService
+        from .transport import create_session
+
         self.config = config
-        self.command_executor = CommandExecutor(config)
+        self.http = create_session()
+        self.command_executor = CommandExecutor(config, http=self.http)
         self.heartbeat_service = HeartbeatService(
             config,
-            command_handler=self.command_executor.execute
+            command_executor=self.command_executor,
+            http=self.http
         )
         self.registration_service = RegistrationService(
             config,
-            on_registered=self._on_registered
+            on_registered=self._on_registered,
+            http=self.http
         )
         self.running = False
+        self._stop_event = threading.Event()
+        # Heartbeats and registration polling share one background thread
+        self._scheduler = sched.scheduler(time.monotonic, self._stop_event.wait)
+        self._scheduler_thread: Optional[threading.Thread] = None
+        self._heartbeat_event: Optional[sched.Event] = None
+        self._registration_event: Optional[sched.Event] = None
         self._web_thread: Optional[threading.Thread] = None
-        self._heartbeat_thread: Optional[threading.Thread] = None
-        self._registration_thread: Optional[threading.Thread] = None
 
     def _on_registered(self, status: dict) -> None:
         """Called when device becomes registered."""
-        logger.info(f"Device registered! Player ID: {status.get('player_id')}")
-        logger.info(f"Name: {status.get('name')}, Group: {status.get('group_name')}")
+        logger.info("Device registered! Player ID: %s", status.get("player_id"))
+        logger.info("Name: %s, Group: %s", status.get("name"), status.get("group_name"))
 
         # Start heartbeat service
         self.start_heartbeat()
@@ -68,38 +79,73 @@ class DigiPlayer:
             self._web_thread.start()
             logger.info("Web UI server started on port 8080")
         except ImportError as e:
-            logger.warning(f"Web server not available: {e}")
+            logger.warning("Web server not available: %s", e)
         except Exception as e:
-            logger.error(f"Failed to start web server: {e}")
+            logger.error("Failed to start web server: %s", e)
 
     def start_registration_polling(self) -> None:
-        """Start registration polling in background."""
+        """Schedule registration polling on the background scheduler."""
         if self.config.player_id:
             logger.info("Already registered, skipping registration polling")
             return
 
-        self._registration_thread = threading.Thread(
-            target=self.registration_service.poll,
-            daemon=True
-        )
-        self._registration_thread.start()
+        self._registration_event = self._scheduler.enter(0, 0, self._poll_registration)
         logger.info("Registration polling started")
+        logger.info("Lookup URL: %s", self.registration_service.lookup_url)
 
     def start_heartbeat(self) -> None:
-        """Start the heartbeat service in a background thread."""
+        """Schedule an immediate heartbeat on the background scheduler."""
         if not self.config.player_id:
             logger.warning("Cannot start heartbeat - not registered")
             return
 
-        if self._heartbeat_thread and self._heartbeat_thread.is_alive():
+        # Pull an already scheduled heartbeat forward
+        if self._heartbeat_event:
+            try:
+                self._scheduler.cancel(self._heartbeat_event)
+            except ValueError:
+                pass
+
+        self._heartbeat_event = self._scheduler.enter(0, 0, self._send_heartbeat)
+        logger.info("Heartbeat service started (interval: %ss)", self.config.heartbeat_interval)
+
+    def start_scheduler(self) -> None:
+        """Start the background thread running scheduled work."""
+        if self._scheduler_thread and self._scheduler_thread.is_alive():
             return
 
-        self._heartbeat_thread = threading.Thread(
-            target=self.heartbeat_service.run,
+        self._scheduler_thread = threading.Thread(
+            target=self._scheduler.run,
             daemon=True
         )
-        self._heartbeat_thread.start()
-        logger.info("Heartbeat service started")
+        self._scheduler_thread.start()
+
+    def _send_heartbeat(self) -> None:
+        """Send a heartbeat and schedule the next one."""
+        if not self.running:
+            return
+
+        try:
+            self.heartbeat_service.send_heartbeat()
+        finally:
+            if self.running:
+                self._heartbeat_event = self._scheduler.enter(
+                    self.config.heartbeat_interval, 0, self._send_heartbeat
+                )
+
+    def _poll_registration(self) -> None:
+        """Check registration and schedule the next check until registered."""
+        if not self.running:
+            return
+
+        registered = False
+        try:
+            registered = self.registration_service.poll_once()
+        finally:
+            if self.running and not registered:
+                self._registration_event = self._scheduler.enter(
+                    self.registration_service.next_poll_delay(), 0, self._poll_registration
+                )
 
     def display_info(self) -> None:
         """Display device information on console."""
@@ -137,19 +183,24 @@ class DigiPlayer:
         # Start web UI server
         self.start_web_server()
 
+        # Cold-start health check; afterwards server status comes from the lookup
+        self.registration_service.probe_server_in_background()
+
         # Check if already registered
         if self.config.player_id:
-            logger.info(f"Device already registered (Player ID: {self.config.player_id})")
+            logger.info("Device already registered (Player ID: %s)", self.config.player_id)
             self.start_heartbeat()
         else:
             # Start registration polling
             self.start_registration_polling()
 
+        self.start_scheduler()
+
         # Main loop
         logger.info("DigiPlayer running. Press Ctrl+C to stop.")
         try:
-            while self.running:
-                time.sleep(1)
+            # Park until a signal or stop() sets the event
+            self._stop_event.wait()
         except KeyboardInterrupt:
             pass
 
@@ -159,13 +210,27 @@ class DigiPlayer:
         """Stop the application."""
         logger.info("Stopping DigiPlayer...")
         self.running = False
+        self._stop_event.set()
+
+        # Drain the scheduler so its thread exits
+        for event in self._scheduler.queue:
+            try:
+                self._scheduler.cancel(event)
+            except ValueError:
+                pass
+
         self.heartbeat_service.stop()
         self.registration_service.stop()
+        # Acks queued for the next heartbeat would otherwise be lost
+        self.command_executor.flush_acks()
+        self.http.close()
 
     def _handle_signal(self, signum: int, frame: Any) -> None:
         """Handle shutdown signals."""
-        logger.info(f"Received signal {signum}")
-        self.stop()
+        logger.info("Received signal %s", signum)
+        # Wake the main loop, which then runs stop()
+        self.running = False
+        self._stop_event.set()
 
 
 def main():
@@ -227,7 +292,7 @@ def main():
     log_level = logging.DEBUG if args.verbose else logging.INFO
     setup_logging(log_level)
 
-    logger.info(f"DigiPlayer V{__version__} starting...")
+    logger.info("DigiPlayer V%s starting...", __version__)
 
     # Load configuration
     config = load_config()
@@ -258,6 +323,8 @@ def main():
         return
 
     if args.test_lookup:
+        from .registration import RegistrationService
+
         reg = RegistrationService(config)
         print(f"Testing lookup for: {config.device_id}")
         print(f"URL: {reg.lookup_url}")
@@ -271,6 +338,8 @@ def main():
             print("Register this device first or use --set-player-id")
             sys.exit(1)
 
+        from .heartbeat import HeartbeatService
+
         heartbeat = HeartbeatService(config)
         result = heartbeat.send_heartbeat()
         print(f"Heartbeat result: {result}")
@@ -4,26 +4,54 @@ Polls the server to check if the device has been registered.
 Once registered, saves the player_id and starts normal operation.
 """
 
+import atexit
 import logging
+import random
+import socket
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable
 
 import requests
 
 from .config import Config, save_config
+from .transport import create_session
 from .utils import get_ip_address
 
 logger = logging.getLogger(__name__)
 
+# Public DNS servers probed (TCP port 53) to detect internet access
+INTERNET_CHECK_HOSTS = ("1.1.1.1", "8.8.8.8")
+
 
 class RegistrationService:
     """Service for checking and handling device registration."""
 
-    def __init__(self, config: Config, on_registered: Optional[Callable] = None):
+    def __init__(
+        self,
+        config: Config,
+        on_registered: Optional[Callable] = None,
+        http: Optional[requests.Session] = None
+    ):
         self.config = config
         self.on_registered = on_registered
-        self.running = False
+        # Only close the session on exit if we created it
+        self._owns_http = http is None
+        self.http = http or create_session()
+        atexit.register(self.close)
+        self.lookup_url = f"{config.api_url}/players/lookup"
+        self._health_url = f"{config.server_url}/api/v1/health"
         self.poll_interval = 5  # seconds
+        # Backoff while the server is unreachable
+        self.max_poll_interval = 300  # seconds
+        self._fail_count = 0
+        self._random = random.SystemRandom()
+        self._update_lock = threading.Lock()
+        # time.monotonic() of the last finished update, None before the first
+        self.last_update_ts: Optional[float] = None
+        # Independent probes run side by side
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="probe")
         self.last_status = {
             "internet": False,
             "server": False,
@@ -32,35 +60,32 @@ class RegistrationService:
             "error": None
         }
 
-    @property
-    def lookup_url(self) -> str:
-        """URL for the lookup endpoint."""
-        return f"{self.config.api_url}/players/lookup"
-
     def check_internet(self) -> bool:
-        """Check if internet is available."""
-        try:
-            requests.get("https://www.google.com", timeout=5)
-            return True
-        except Exception:
+        """Check if internet is available.
+
+        A TCP connect to a public DNS server is enough to prove a working
+        route out, without a TLS handshake and HTTP round trip.
+        """
+        for host in INTERNET_CHECK_HOSTS:
             try:
-                requests.get("https://1.1.1.1", timeout=5)
+                socket.create_connection((host, 53), timeout=1).close()
                 return True
-            except Exception:
-                return False
+            except OSError:
+                pass
+        return False
 
     def check_server(self) -> bool:
         """Check if DigiPlayer server is reachable."""
         try:
-            response = requests.get(
-                f"{self.config.server_url}/api/v1/health",
+            response = self.http.get(
+                self._health_url,
                 timeout=5
             )
             return response.status_code == 200
         except Exception:
             # Try the lookup endpoint as fallback
             try:
-                response = requests.get(
+                response = self.http.get(
                     self.lookup_url,
                     params={"unique_id": "test"},
                     timeout=5
@@ -69,14 +94,50 @@ class RegistrationService:
             except Exception:
                 return False
 
+    def probe_server(self) -> bool:
+        """Check once at startup whether the server is reachable.
+
+        The result is shown in the UI until the first status update; later
+        updates infer it from the registration lookup.
+        """
+        online = self.check_server()
+        if online:
+            logger.info("Server %s is reachable", self.config.server_url)
+        else:
+            logger.warning("Server %s is not reachable", self.config.server_url)
+
+        # A running or finished update already has a fresher answer
+        if self._update_lock.acquire(blocking=False):
+            try:
+                if self.last_update_ts is None:
+                    self.last_status["server"] = online
+            finally:
+                self._update_lock.release()
+        return online
+
+    def probe_server_in_background(self) -> None:
+        """Run the startup server check without holding up other work."""
+        threading.Thread(target=self.probe_server, daemon=True).start()
+
     def check_registration(self) -> dict:
         """Check if this device is registered on the server.
 
         Returns:
             dict with registration info or error
         """
+        return self._lookup_registration()[1]
+
+    def _lookup_registration(self) -> tuple[bool, dict]:
+        """Look up this device on the server.
+
+        Any 2xx/4xx answer also proves the server is up, so this doubles
+        as the server health check.
+
+        Returns:
+            (server reachable, dict with registration info or error)
+        """
         try:
-            response = requests.get(
+            response = self.http.get(
                 self.lookup_url,
                 params={"unique_id": self.config.device_id},
                 timeout=10
@@ -84,82 +145,127 @@ class RegistrationService:
 
             if response.status_code == 200:
                 data = response.json()
-                return data
+                return True, data
             else:
-                return {
+                return response.status_code < 500, {
                     "registered": False,
                     "error": f"HTTP {response.status_code}"
                 }
 
         except requests.exceptions.Timeout:
-            return {"registered": False, "error": "Timeout"}
+            return False, {"registered": False, "error": "Timeout"}
         except requests.exceptions.ConnectionError:
-            return {"registered": False, "error": "Connection error"}
+            return False, {"registered": False, "error": "Connection error"}
         except Exception as e:
-            return {"registered": False, "error": str(e)}
+            return False, {"registered": False, "error": str(e)}
 
     def update_status(self) -> dict:
-        """Update and return current status."""
-        self.last_status["ip_address"] = get_ip_address()
-        self.last_status["internet"] = self.check_internet()
+        """Update and return current status.
 
-        if self.last_status["internet"]:
-            self.last_status["server"] = self.check_server()
-        else:
-            self.last_status["server"] = False
-
-        if self.last_status["server"]:
-            result = self.check_registration()
-            self.last_status["registered"] = result.get("registered", False)
-            self.last_status["error"] = result.get("error")
-
-            if self.last_status["registered"]:
-                # Save player_id to config
-                player_id = result.get("player_id")
-                if player_id and player_id != self.config.player_id:
-                    logger.info(f"Device registered! Player ID: {player_id}")
-                    self.config.player_id = player_id
-                    save_config(self.config)
-
-                    # Include all registration info
-                    self.last_status["player_id"] = player_id
-                    self.last_status["name"] = result.get("name")
-                    self.last_status["group_name"] = result.get("group_name")
-                    self.last_status["playlist_name"] = result.get("playlist_name")
-        else:
-            self.last_status["registered"] = False
+        Only one update runs at a time. Callers arriving while the poller or
+        another web request is already updating wait for that update and
+        share its result instead of issuing their own requests.
+        """
+        if not self._update_lock.acquire(blocking=False):
+            with self._update_lock:
+                return self.last_status
+
+        try:
+            status = self._refresh_status()
+            self.last_update_ts = time.monotonic()
+            return status
+        finally:
+            self._update_lock.release()
+
+    def update_status_in_background(self) -> None:
+        """Start a status update on a background thread unless one is running."""
+        if self._update_lock.locked():
+            return
+
+        threading.Thread(target=self.update_status, daemon=True).start()
+
+    def _refresh_status(self) -> dict:
+        """Run the connectivity and registration checks.
+
+        The registration lookup also answers whether the server is up, so
+        one request per update covers both.
+        """
+        ip_future = self._executor.submit(get_ip_address)
+        internet_future = self._executor.submit(self.check_internet)
+        lookup_future = self._executor.submit(self._lookup_registration)
+
+        self.last_status["ip_address"] = ip_future.result()
+        self.last_status["internet"] = internet_future.result()
+        server, result = lookup_future.result()
+        self.last_status["server"] = server
+        self.last_status["registered"] = result.get("registered", False)
+        self.last_status["error"] = result.get("error")
+
+        if self.last_status["registered"]:
+            # Save player_id to config
+            player_id = result.get("player_id")
+            if player_id and player_id != self.config.player_id:
+                logger.info("Device registered! Player ID: %s", player_id)
+                self.config.player_id = player_id
+                save_config(self.config)
+
+                # Include all registration info
+                self.last_status["player_id"] = player_id
+                self.last_status["name"] = result.get("name")
+                self.last_status["group_name"] = result.get("group_name")
+                self.last_status["playlist_name"] = result.get("playlist_name")
 
         return self.last_status
 
-    def poll(self) -> None:
-        """Run registration polling loop."""
-        self.running = True
-        logger.info(f"Starting registration polling (interval: {self.poll_interval}s)")
-        logger.info(f"Device ID: {self.config.device_id}")
-        logger.info(f"Lookup URL: {self.lookup_url}")
-
-        while self.running:
-            status = self.update_status()
-
-            if status["registered"]:
-                logger.info("Device is registered!")
-                if self.on_registered:
-                    self.on_registered(status)
-                break
-
-            # Log status periodically
-            if status["error"]:
-                logger.warning(f"Registration check failed: {status['error']}")
-            else:
-                logger.debug(f"Waiting for registration... Internet: {status['internet']}, Server: {status['server']}")
+    def poll_once(self) -> bool:
+        """Run a single registration check.
+
+        Returns:
+            True if the device is registered
+        """
+        status = self.update_status()
+
+        # Back off only while the server can't be reached; "not registered
+        # yet" answers keep the normal cadence
+        self._fail_count = 0 if status["server"] else self._fail_count + 1
+
+        if status["registered"]:
+            logger.info("Device is registered!")
+            if self.on_registered:
+                self.on_registered(status)
+            return True
+
+        # Log status periodically
+        if status["error"]:
+            logger.warning("Registration check failed: %s", status["error"])
+        else:
+            logger.debug("Waiting for registration... Internet: %s, Server: %s", status["internet"], status["server"])
+
+        return False
+
+    def next_poll_delay(self) -> float:
+        """Seconds to wait before the next registration check.
 
-            time.sleep(self.poll_interval)
+        Uses capped exponential backoff with full jitter after failures so
+        a fleet of players doesn't retry an unreachable server in lockstep.
+        """
+        if not self._fail_count:
+            return self.poll_interval
+
+        exponent = min(self._fail_count - 1, 16)
+        ceiling = min(self.max_poll_interval, self.poll_interval * 2 ** exponent)
+        return self._random.uniform(0, ceiling)
 
     def stop(self) -> None:
-        """Stop the polling loop."""
-        self.running = False
+        """Stop registration polling."""
         logger.info("Registration polling stopped")
 
+    def close(self) -> None:
+        """Release the probe threads and the HTTP session if we created it."""
+        self._executor.shutdown(wait=False)
+        if self._owns_http:
+            self.http.close()
+
     def get_status_for_ui(self) -> dict:
         """Get status formatted for UI display."""
         return {
@@ -0,0 +1,48 @@
+"""HTTP transport for DigiPlayer client."""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Transient failures are retried inside urllib3 on the pooled connection.
+# Worst case for a heartbeat is (RETRY_TOTAL + 1) attempts of up to
+# connect + read timeout each, plus backoff: 3 * (3 + 5) + 0 + 1 = 25 seconds,
+# below the default 30 second heartbeat interval.
+RETRY_TOTAL = 2
+RETRY_BACKOFF_FACTOR = 0.5
+# Only 503 means the server turned the request away unprocessed; after a
+# gateway 502/504 the upstream may already have handled the POST
+RETRY_STATUS_CODES = (503,)
+
+# (connect, read) timeout in seconds for heartbeats
+REQUEST_TIMEOUT = (3, 5)
+
+
+def create_retry() -> Retry:
+    """Create the retry policy for server requests."""
+    return Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        # A timed out request may already have reached the server; replaying
+        # a heartbeat would re-send its command acks
+        read=False,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["POST", "PUT"]),
+        raise_on_status=False,
+        # Don't let a server Retry-After push us past the next heartbeat
+        respect_retry_after_header=False
+    )
+
+
+def create_session() -> requests.Session:
+    """Create a pooled HTTP session for talking to the server.
+
+    The session keeps the TLS connection alive between heartbeats, command
+    acknowledgements and registration checks instead of reconnecting on
+    every request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=create_retry())
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
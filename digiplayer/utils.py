@@ -1,16 +1,70 @@
 """Utility functions for DigiPlayer client."""
 
+import functools
 import hashlib
+import json
 import logging
 import os
 import re
+import shutil
 import socket
 import subprocess
+import time
 from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+try:
+    import orjson
+except ImportError:  # No wheel for this platform - use the stdlib encoder
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Matched against raw tool output to skip decoding it
+_FBSET_RE = re.compile(rb"geometry (\d+) (\d+)")
+_XRANDR_RE = re.compile(rb"current (\d+) x (\d+)")
+
+
+def _ttl_cache(ttl_seconds: float) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """Cache the result of a no-argument function for ttl_seconds.
+
+    The wrapped function gets a cache_clear() method like functools caches.
+    """
+    def decorator(func: Callable[[], T]) -> Callable[[], T]:
+        cache: list = []  # [value, expiry] once computed
+
+        @functools.wraps(func)
+        def wrapper() -> T:
+            now = time.monotonic()
+            if cache and now < cache[1]:
+                return cache[0]
+            value = func()
+            cache[:] = [value, now + ttl_seconds]
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
 
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def json_loads(data: bytes) -> Any:
+    """Deserialize JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@functools.lru_cache(maxsize=1)
 def get_cpu_serial() -> str:
     """Get Raspberry Pi CPU serial number from /proc/cpuinfo."""
     try:
@@ -25,6 +79,7 @@ def get_cpu_serial() -> str:
     return "0000000000000000"
 
 
+@functools.lru_cache(maxsize=1)
 def get_mac_address() -> str:
     """Get primary network interface MAC address."""
     # Try common interface names
@@ -43,19 +98,24 @@ def get_mac_address() -> str:
     return format(mac, "012x")
 
 
+@_ttl_cache(30)
 def get_ip_address() -> str:
     """Get the device's IP address."""
     try:
-        # Connect to external server to determine IP
+        # Connect to external server to determine IP; a UDP connect sends
+        # nothing, it only picks the route, so a short timeout is plenty
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
+        try:
+            s.settimeout(0.5)
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+        finally:
+            s.close()
     except Exception:
         return "0.0.0.0"
 
 
+@_ttl_cache(60)
 def get_screen_resolution() -> str:
     """Get current screen resolution."""
     try:
@@ -63,51 +123,53 @@ def get_screen_resolution() -> str:
         result = subprocess.run(
             ["fbset", "-s"],
             capture_output=True,
-            text=True,
             timeout=5
         )
         if result.returncode == 0:
-            match = re.search(r'geometry (\d+) (\d+)', result.stdout)
+            match = _FBSET_RE.search(result.stdout)
             if match:
-                return f"{match.group(1)}x{match.group(2)}"
+                return f"{match.group(1).decode()}x{match.group(2).decode()}"
 
         # Try xrandr
         result = subprocess.run(
             ["xrandr", "--current"],
             capture_output=True,
-            text=True,
             timeout=5,
             env={**os.environ, "DISPLAY": ":0"}
         )
         if result.returncode == 0:
-            match = re.search(r'current (\d+) x (\d+)', result.stdout)
+            match = _XRANDR_RE.search(result.stdout)
             if match:
-                return f"{match.group(1)}x{match.group(2)}"
+                return f"{match.group(1).decode()}x{match.group(2).decode()}"
     except Exception as e:
-        logger.debug(f"Could not get resolution: {e}")
+        logger.debug("Could not get resolution: %s", e)
 
     return "unknown"
 
 
+@_ttl_cache(60)
 def get_storage_info() -> tuple[int, int]:
     """Get storage usage in bytes. Returns (used, total)."""
     try:
-        statvfs = os.statvfs("/")
-        total = statvfs.f_frsize * statvfs.f_blocks
-        free = statvfs.f_frsize * statvfs.f_bavail
-        used = total - free
-        return used, total
+        usage = shutil.disk_usage("/")
+        return usage.used, usage.total
     except Exception:
         return 0, 0
 
 
+@functools.lru_cache(maxsize=1)
 def generate_device_id() -> str:
-    """Generate unique device ID based on hardware."""
+    """Generate unique device ID based on hardware.
+
+    Devices set up before the switch from MD5 keep their original ID,
+    since the ID is persisted in config.json and only generated when
+    the config has none.
+    """
     cpu_serial = get_cpu_serial()
     mac = get_mac_address()
 
     unique = f"{cpu_serial}-{mac}"
-    hash_value = hashlib.md5(unique.encode()).hexdigest()[:12].upper()
+    hash_value = hashlib.blake2b(unique.encode(), digest_size=6).hexdigest().upper()
     return f"DIG{hash_value}"
 
 
@@ -119,11 +181,19 @@ def setup_logging(level: int = logging.INFO) -> None:
         datefmt="%Y-%m-%d %H:%M:%S"
     )
 
+    # urllib3 logs a warning for every transport retry, several lines per
+    # registration poll while the server is down; keep them for -v only
+    if level > logging.DEBUG:
+        logging.getLogger("urllib3").setLevel(logging.ERROR)
 
+
+@functools.lru_cache(maxsize=1)
 def is_raspberry_pi() -> bool:
     """Check if running on a Raspberry Pi."""
     try:
-        with open("/proc/cpuinfo", "r") as f:
-            return "Raspberry Pi" in f.read() or "BCM" in f.read()
+        # Search the raw bytes; procfs files can't be mmapped (size 0)
+        with open("/proc/cpuinfo", "rb") as f:
+            cpuinfo = f.read()
+        return b"Raspberry Pi" in cpuinfo or b"BCM" in cpuinfo
     except FileNotFoundError:
         return False
@@ -25,24 +25,13 @@ for i in {1..30}; do
     sleep 2
 done
 
-# Generate and save device ID
+# Generate and save device ID; load_config() also creates
+# /etc/digiplayer/config.json if it doesn't exist yet
 echo "Generating device ID..."
 cd /opt/digiplayer
-DEVICE_ID=$(python3 -c "import sys; sys.path.insert(0, '.'); from digiplayer.utils import generate_device_id; print(generate_device_id())")
+DEVICE_ID=$(python3 -c "import sys; sys.path.insert(0, '.'); from digiplayer.config import load_config; print(load_config().device_id)")
 echo "Device ID: $DEVICE_ID"
 
-# Create initial config if not exists
-if [ ! -f /etc/digiplayer/config.json ]; then
-    python3 -c "
-import sys
-sys.path.insert(0, '.')
-from digiplayer.config import load_config, save_config
-config = load_config()
-save_config(config)
-print('Config created')
-"
-fi
-
 # Mark as done
 mkdir -p /etc/digiplayer
 touch "$MARKER_FILE"
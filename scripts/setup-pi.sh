@@ -99,7 +99,7 @@ EOF
 echo ""
 echo "Step 9: Generating Device ID..."
 cd "$INSTALL_DIR"
-DEVICE_ID=$(python3 -c "import sys; sys.path.insert(0, '.'); from digiplayer.utils import generate_device_id; print(generate_device_id())")
+DEVICE_ID=$(python3 -c "import sys; sys.path.insert(0, '.'); from digiplayer.config import load_config; print(load_config().device_id)")
 
 echo ""
 echo "=================================="
@@ -6,11 +6,24 @@ Provides:
 - WiFi configuration (when in hotspot mode)
 """
 
+import functools
 import logging
+import math
 import os
+import re
+import subprocess
+import sys
+import threading
+import time
 from pathlib import Path
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, request
+
+if __name__ == "__main__":
+    # Run directly as web/server.py; make the digiplayer package importable
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from digiplayer.utils import json_dumps
 
 logger = logging.getLogger(__name__)
 
@@ -25,11 +38,35 @@ app = Flask(
     static_folder=str(STATIC_DIR)
 )
 
+# /api/status serves cached status younger than STATUS_MAX_AGE as is,
+# refreshes in the background up to STATUS_STALE_WHILE_REVALIDATE,
+# and only blocks on a fresh update past that
+STATUS_MAX_AGE = 2  # seconds
+STATUS_STALE_WHILE_REVALIDATE = 30  # seconds
+
+# WiFi scans take several seconds, so results are cached and refreshed
+# in the background once older than WIFI_SCAN_TTL
+WIFI_SCAN_TTL = 15  # seconds
+_SSID_RE = re.compile(r'ESSID:"([^"]*)"')
+_scan_cache = {"ts": None, "networks": [], "error": None}  # ts: time.monotonic()
+_scan_lock = threading.Lock()
+
+WPA_SUPPLICANT_CONF = "/etc/wpa_supplicant/wpa_supplicant.conf"
+WPA_SUPPLICANT_HEADER = (
+    "ctrl_interface=DIR=/var/run/wpa_supplicant GROUP=netdev\n"
+    "update_config=1\n"
+)
+
 # Will be set by main.py
 registration_service = None
 config = None
 
 
+def json_response(data, status=200):
+    """Build a JSON response, encoded with orjson when available."""
+    return app.response_class(json_dumps(data), status=status, mimetype="application/json")
+
+
 def init_app(reg_service, app_config):
     """Initialize the web app with services."""
     global registration_service, config
@@ -37,6 +74,16 @@ def init_app(reg_service, app_config):
     config = app_config
 
 
+@functools.lru_cache(maxsize=8)
+def _render_page(template, status_items):
+    """Render a page template to bytes.
+
+    The pages depend only on the status, so repeat loads with an unchanged
+    status are served from the cache without re-rendering.
+    """
+    return render_template(template, status=dict(status_items)).encode()
+
+
 @app.route("/")
 def index():
     """Main page - shows registration or status screen."""
@@ -45,19 +92,32 @@ def index():
         status = registration_service.get_status_for_ui()
 
     if status.get("registered"):
-        return render_template("status.html", status=status)
+        template = "status.html"
     else:
-        return render_template("registration.html", status=status)
+        template = "registration.html"
+
+    body = _render_page(template, tuple(sorted(status.items())))
+    return app.response_class(body, mimetype="text/html")
 
 
 @app.route("/api/status")
 def api_status():
     """API endpoint for getting current status (for AJAX polling)."""
     if registration_service:
-        # Update status before returning
-        registration_service.update_status()
-        return jsonify(registration_service.get_status_for_ui())
-    return jsonify({"error": "Service not initialized"})
+        last_update = registration_service.last_update_ts
+        age = math.inf if last_update is None else time.monotonic() - last_update
+        if age >= STATUS_STALE_WHILE_REVALIDATE:
+            registration_service.update_status()
+        elif age >= STATUS_MAX_AGE:
+            registration_service.update_status_in_background()
+
+        response = json_response(registration_service.get_status_for_ui())
+        response.headers["Cache-Control"] = (
+            f"max-age={STATUS_MAX_AGE}, "
+            f"stale-while-revalidate={STATUS_STALE_WHILE_REVALIDATE}"
+        )
+        return response
+    return json_response({"error": "Service not initialized"})
 
 
 @app.route("/wifi")
@@ -66,11 +126,12 @@ def wifi_setup():
     return render_template("wifi_setup.html")
 
 
-@app.route("/api/wifi/scan")
-def wifi_scan():
-    """Scan for available WiFi networks."""
+def _scan_wifi():
+    """Scan for WiFi networks and store the result in the scan cache.
+
+    The caller must hold _scan_lock; it is released when the scan is done.
+    """
     try:
-        import subprocess
         result = subprocess.run(
             ["sudo", "iwlist", "wlan0", "scan"],
             capture_output=True,
@@ -78,18 +139,71 @@ def wifi_scan():
             timeout=30
         )
 
-        # Parse output for SSIDs
-        networks = []
-        for line in result.stdout.split("\n"):
-            if "ESSID:" in line:
-                ssid = line.split("ESSID:")[1].strip().strip('"')
-                if ssid and ssid not in networks:
-                    networks.append(ssid)
-
-        return jsonify({"networks": networks})
+        # Unique non-empty SSIDs in scan order
+        networks = list(dict.fromkeys(ssid for ssid in _SSID_RE.findall(result.stdout) if ssid))
+        _scan_cache.update(ts=time.monotonic(), networks=networks, error=None)
     except Exception as e:
-        logger.error(f"WiFi scan failed: {e}")
-        return jsonify({"error": str(e), "networks": []})
+        logger.error("WiFi scan failed: %s", e)
+        _scan_cache.update(ts=time.monotonic(), error=str(e))
+    finally:
+        _scan_lock.release()
+
+
+@app.route("/api/wifi/scan")
+def wifi_scan():
+    """Scan for available WiFi networks."""
+    scanned = _scan_cache["ts"]
+    age = math.inf if scanned is None else time.monotonic() - scanned
+    if age > WIFI_SCAN_TTL and _scan_lock.acquire(blocking=False):
+        if scanned is not None:
+            threading.Thread(target=_scan_wifi, daemon=True).start()
+        else:
+            # Nothing to show yet, so the first scan is waited for
+            _scan_wifi()
+
+    if _scan_cache["error"]:
+        return json_response({"error": _scan_cache["error"], "networks": _scan_cache["networks"]})
+    return json_response({"networks": _scan_cache["networks"]})
+
+
+def _wpa_header(path):
+    """Get the global settings (everything before the first network block) of a wpa_supplicant config."""
+    try:
+        with open(path, "r") as f:
+            header = f.read().split("network={", 1)[0].strip()
+    except FileNotFoundError:
+        header = ""
+    return f"{header}\n" if header else WPA_SUPPLICANT_HEADER
+
+
+def _wpa_network(ssid, password):
+    """Build a wpa_supplicant network block.
+
+    The SSID is written hex-encoded so quotes or newlines in it can't break
+    out of the block. The PSK is derived once by wpa_passphrase so
+    wpa_supplicant doesn't re-run PBKDF2 on every association.
+    """
+    lines = [f"\tssid={ssid.encode().hex()}"]
+    if password:
+        # Passphrase via stdin keeps it out of the process list
+        result = subprocess.run(
+            ["wpa_passphrase", ssid],
+            input=f"{password}\n",
+            capture_output=True,
+            text=True
+        )
+        output = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        if result.returncode != 0:
+            raise ValueError(output[-1] if output else "Invalid password")
+        psk = next((line for line in output if line.startswith("psk=")), None)
+        if not psk:
+            raise ValueError("Could not derive WiFi key")
+        lines += [f"\t{psk}", "\tkey_mgmt=WPA-PSK"]
+    else:
+        lines.append("\tkey_mgmt=NONE")
+
+    body = "\n".join(lines)
+    return f"network={{\n{body}\n}}\n"
 
 
 @app.route("/api/wifi/connect", methods=["POST"])
@@ -100,36 +214,56 @@ def wifi_connect():
     password = data.get("password")
 
     if not ssid:
-        return jsonify({"error": "SSID required"}), 400
+        return json_response({"error": "SSID required"}, 400)
+
+    try:
+        network = _wpa_network(ssid, password)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    except OSError as e:
+        # e.g. wpa_passphrase isn't installed
+        logger.error("WiFi connect failed: %s", e)
+        return json_response({"error": str(e)}, 500)
 
     try:
-        # Write wpa_supplicant config
-        wpa_config = f'''
-network={{
-    ssid="{ssid}"
-    psk="{password}"
-    key_mgmt=WPA-PSK
-}}
-'''
-        config_path = "/etc/wpa_supplicant/wpa_supplicant.conf"
-
-        # Append to existing config
-        with open(config_path, "a") as f:
-            f.write(wpa_config)
+        # Replace the config atomically; keep it private since it holds the PSK
+        config_text = f"{_wpa_header(WPA_SUPPLICANT_CONF)}\n{network}"
+        tmp_path = f"{WPA_SUPPLICANT_CONF}.new"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(config_text)
+        os.replace(tmp_path, WPA_SUPPLICANT_CONF)
 
         # Restart networking
-        import subprocess
         subprocess.run(["sudo", "wpa_cli", "-i", "wlan0", "reconfigure"], check=True)
 
-        return jsonify({"success": True, "message": "WiFi configured. Reconnecting..."})
+        return json_response({"success": True, "message": "WiFi configured. Reconnecting..."})
     except Exception as e:
-        logger.error(f"WiFi connect failed: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("WiFi connect failed: %s", e)
+        return json_response({"error": str(e)}, 500)
 
 
 def run_server(host="0.0.0.0", port=8080, debug=False):
-    """Run the Flask server."""
-    logger.info(f"Starting web server on {host}:{port}")
+    """Run the web server.
+
+    Uses waitress when installed; the Flask development server is only
+    used for debugging or as a fallback.
+    """
+    logger.info("Starting web server on %s:%s", host, port)
+
+    if not debug:
+        try:
+            from waitress import serve
+        except ImportError:
+            logger.warning("waitress not installed, using Flask development server")
+        else:
+            serve(app, host=host, port=port, threads=4, connection_limit=64, channel_timeout=30)
+            return
+
+        # The kiosk browser polls the API every few seconds; don't write an
+        # access log line to the journal for each request
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
     app.run(host=host, port=port, debug=debug, threaded=True)
 
 